@@ -1,147 +1,239 @@
 from flask import Flask, render_template, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import math
+import multiprocessing
+import os
+import threading
 import numpy as np
-from scipy import signal as scipy_signal
 import json
+from spectral import analyze_signal, analyze_signals
 
-app = Flask(__name__)
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:  # Fall back to the vectorized NumPy encoders
+    HAS_NUMBA = False
 
-# Line coding encoding functions (from main.py)
-def encode_nrz_l(data, samples_per_bit):
-    """Encodes binary data using Non-Return-to-Zero-Level (NRZ-L)."""
-    data_upsampled = np.repeat(data, samples_per_bit)
-    return np.where(data_upsampled == 1, 1, -1).tolist()
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:  # Fall back to Flask's stdlib json provider
+    HAS_ORJSON = False
 
-def encode_rz(data, samples_per_bit):
-    """Encodes binary data using Polar Return-to-Zero (RZ)."""
-    total_samples = len(data) * samples_per_bit
-    rz_signal = np.zeros(total_samples)
-    half_bit_samples = samples_per_bit // 2
-    
-    for i, bit in enumerate(data):
-        start_index = i * samples_per_bit
-        mid_index = start_index + half_bit_samples
-        
-        if bit == 1:
-            rz_signal[start_index:mid_index] = 1
-        else:
-            rz_signal[start_index:mid_index] = -1
-            
-    return rz_signal.tolist()
-
-def encode_manchester(data, samples_per_bit):
-    """Encodes binary data using Manchester encoding."""
-    total_samples = len(data) * samples_per_bit
-    manchester_signal = np.zeros(total_samples)
-    half_bit_samples = samples_per_bit // 2
-    
-    for i, bit in enumerate(data):
-        start_index = i * samples_per_bit
-        mid_index = start_index + half_bit_samples
-        end_index = start_index + samples_per_bit
-        
-        if bit == 1:
-            manchester_signal[start_index:mid_index] = -1
-            manchester_signal[mid_index:end_index] = 1
-        else:
-            manchester_signal[start_index:mid_index] = 1
-            manchester_signal[mid_index:end_index] = -1
-            
-    return manchester_signal.tolist()
-
-def encode_ami(data, samples_per_bit):
-    """Encodes binary data using Alternate Mark Inversion (AMI)."""
-    total_samples = len(data) * samples_per_bit
-    ami_signal = np.zeros(total_samples)
-    last_polarity = 1
-    
-    for i, bit in enumerate(data):
-        if bit == 1:
-            start_index = i * samples_per_bit
-            end_index = start_index + samples_per_bit
-            ami_signal[start_index:end_index] = last_polarity
-            last_polarity *= -1
-            
-    return ami_signal.tolist()
-
-# Spectral Analysis Functions
-def calculate_fft(signal_array, sampling_rate):
-    """Calculate FFT and frequency spectrum of a signal."""
-    signal = np.array(signal_array)
-    n = len(signal)
-    
-    # Compute FFT
-    fft_vals = np.fft.fft(signal)
-    fft_magnitude = np.abs(fft_vals)
-    
-    # Frequency axis (normalized by Nyquist frequency)
-    freqs = np.fft.fftfreq(n, 1/sampling_rate)
+class NumpyJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes NumPy arrays, using orjson when it is installed."""
     
-    # Only return positive frequencies (first half)
-    positive_freq_idx = freqs >= 0
-    freqs_positive = freqs[positive_freq_idx]
-    magnitude_positive = fft_magnitude[positive_freq_idx]
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        return DefaultJSONProvider.default(o)
     
-    # Normalize
-    magnitude_normalized = magnitude_positive / np.max(magnitude_positive) if np.max(magnitude_positive) > 0 else magnitude_positive
+    def dumps(self, obj, **kwargs):
+        if HAS_ORJSON:
+            # orjson encodes contiguous arrays natively; keys sorted like the default provider
+            return orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS).decode()
+        return super().dumps(obj, **kwargs)
     
-    return freqs_positive.tolist(), magnitude_normalized.tolist()
+    def loads(self, s, **kwargs):
+        if HAS_ORJSON:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
 
-def calculate_psd(signal_array, sampling_rate):
-    """Calculate Power Spectral Density using Welch's method."""
-    signal = np.array(signal_array)
+app = Flask(__name__)
+app.json = NumpyJSONProvider(app)
+
+# Shared PCG64 generator for /api/generate
+_rng = np.random.default_rng()
+
+# Numba kernel: straight loops filling a preallocated int8 buffer.
+# For the small inputs the UI sends, this avoids NumPy's per-call overhead.
+if HAS_NUMBA:
+    @njit(cache=True, parallel=True)
+    def _encode_all_numba(data, samples_per_bit, out):
+        # AMI polarity depends on the preceding marks, so resolve it first
+        ami_levels = np.empty(data.size, dtype=np.int8)
+        polarity = 1
+        for i in range(data.size):
+            if data[i] == 1:
+                ami_levels[i] = polarity
+                polarity = -polarity
+            else:
+                ami_levels[i] = 0
+        
+        # Then fill all four rows in a single parallel pass over the bits
+        half = samples_per_bit // 2
+        for i in prange(data.size):
+            start = i * samples_per_bit
+            mid = start + half
+            end = start + samples_per_bit
+            level = 1 if data[i] == 1 else -1
+            out[0, start:end] = level
+            out[1, start:mid] = level
+            out[1, mid:end] = 0
+            out[2, start:mid] = -level
+            out[2, mid:end] = level
+            out[3, start:end] = ami_levels[i]
+
+# Cached per-request constants (samples_per_bit rarely changes between calls).
+# Arrays are marked read-only since they are shared across requests.
+@lru_cache(maxsize=32)
+def _half_bit_templates(samples_per_bit):
+    """Returns the RZ pulse mask and Manchester Low-to-High template for one bit."""
+    half_bit_samples = samples_per_bit // 2
     
-    # Use Welch's method for better spectral estimation
-    freqs, psd = scipy_signal.welch(signal, sampling_rate, nperseg=min(256, len(signal)//4))
+    rz_mask = np.zeros(samples_per_bit, dtype=np.int8)
+    rz_mask[:half_bit_samples] = 1
     
-    # Normalize
-    psd_normalized = psd / np.max(psd) if np.max(psd) > 0 else psd
+    manchester_template = np.ones(samples_per_bit, dtype=np.int8)
+    manchester_template[:half_bit_samples] = -1
     
-    return freqs.tolist(), psd_normalized.tolist()
+    rz_mask.setflags(write=False)
+    manchester_template.setflags(write=False)
+    return rz_mask, manchester_template
 
-def calculate_spectral_efficiency_metrics(signal_array, data_rate, sampling_rate):
-    """Calculate spectral efficiency metrics."""
-    signal = np.array(signal_array)
-    
-    # Calculate FFT
-    fft_vals = np.fft.fft(signal)
-    n = len(signal)
-    freqs = np.fft.fftfreq(n, 1/sampling_rate)
-    psd = np.abs(fft_vals) ** 2
-    
-    # Only positive frequencies
-    positive_idx = freqs >= 0
-    freqs_positive = freqs[positive_idx]
-    psd_positive = psd[positive_idx]
+# Browsers cannot usefully draw more waveform points than this per trace
+MAX_PLOT_POINTS = 2000
+
+def _plot_stride(total_samples, samples_per_bit, max_points=MAX_PLOT_POINTS):
+    """
+    Returns the stride used to decimate waveforms for plotting.
     
-    # Calculate DC component (power at 0 Hz)
-    dc_power = psd_positive[0] if len(psd_positive) > 0 else 0
-    total_power = np.sum(psd_positive)
-    dc_percentage = (dc_power / total_power * 100) if total_power > 0 else 0
+    Levels only change at multiples of gcd(half bit, full bit) samples, so any
+    stride dividing that keeps every transition. The smallest such stride that
+    fits max_points is used, or the largest lossless one if none fits.
+    """
+    target = -(-total_samples // max_points)
+    step = math.gcd(samples_per_bit // 2, samples_per_bit)
+    for stride in range(target, step):
+        if step % stride == 0:
+            return stride
+    return step
+
+# Line coding encoding functions (from main.py), used when Numba is unavailable.
+# Each *_into variant writes len(data) * samples_per_bit samples into a
+# caller-provided buffer, so several encodings can share one array. Levels are
+# only ever -1, 0 or +1, so buffers are int8 and promoted to float32 for FFTs.
+def encode_nrz_l_into(data, samples_per_bit, out):
+    """Writes the Non-Return-to-Zero-Level (NRZ-L) encoding of data into out."""
+    level = np.where(data == 1, np.int8(1), np.int8(-1))
+    out.reshape(len(data), samples_per_bit)[:] = level[:, None]
+
+def encode_rz_into(data, samples_per_bit, out):
+    """Writes the Polar Return-to-Zero (RZ) encoding of data into out."""
+    # Per-bit polarity, shaped by a half-bit pulse mask
+    polarity = np.where(data == 1, np.int8(1), np.int8(-1))
+    mask, _ = _half_bit_templates(samples_per_bit)
     
-    # Calculate bandwidth (frequency where 90% of power is contained)
-    cumulative_power = np.cumsum(psd_positive)
-    total_power_90 = total_power * 0.9
-    bandwidth_idx = np.where(cumulative_power >= total_power_90)[0]
-    bandwidth_90 = freqs_positive[bandwidth_idx[0]] if len(bandwidth_idx) > 0 else freqs_positive[-1]
+    np.multiply.outer(polarity, mask, out=out.reshape(len(data), samples_per_bit))
+
+def encode_manchester_into(data, samples_per_bit, out):
+    """Writes the Manchester encoding of data into out."""
+    # Low-to-High template for a 1 bit; a 0 bit is its negation
+    _, template = _half_bit_templates(samples_per_bit)
+    sign = np.where(data == 1, np.int8(1), np.int8(-1))
     
-    # Spectral efficiency (bits per Hz)
-    spectral_efficiency = data_rate / bandwidth_90 if bandwidth_90 > 0 else 0
+    np.multiply.outer(sign, template, out=out.reshape(len(data), samples_per_bit))
+
+def encode_ami_into(data, samples_per_bit, out):
+    """Writes the Alternate Mark Inversion (AMI) encoding of data into out."""
+    ones = (data == 1).astype(np.int8)
     
-    # Find peak frequency
-    peak_idx = np.argmax(psd_positive[1:]) + 1  # Skip DC component
-    peak_frequency = freqs_positive[peak_idx] if peak_idx < len(freqs_positive) else 0
+    # Polarity alternates with the running count of marks (odd -> +1, even -> -1)
+    mark_count = np.cumsum(ones)
+    polarity = np.where(ones == 1, 1 - 2 * ((mark_count - 1) & 1), 0).astype(np.int8)
     
-    # Bandwidth efficiency (normalized by data rate)
-    bandwidth_efficiency = bandwidth_90 / data_rate if data_rate > 0 else 0
+    out.reshape(len(data), samples_per_bit)[:] = polarity[:, None]
+
+def encode_all_into(data, samples_per_bit, out):
+    """Writes NRZ-L, RZ, Manchester and AMI encodings into rows 0-3 of out."""
+    if HAS_NUMBA:
+        _encode_all_numba(data, samples_per_bit, out)
+        return
     
-    return {
-        'dc_component': float(dc_percentage),
-        'bandwidth_90': float(bandwidth_90),
-        'spectral_efficiency': float(spectral_efficiency),
-        'peak_frequency': float(peak_frequency),
-        'bandwidth_efficiency': float(bandwidth_efficiency),
-        'total_power': float(total_power)
-    }
+    encode_nrz_l_into(data, samples_per_bit, out[0])
+    encode_rz_into(data, samples_per_bit, out[1])
+    encode_manchester_into(data, samples_per_bit, out[2])
+    encode_ami_into(data, samples_per_bit, out[3])
+
+# Row order of the batched waveform buffer returned by encode_waveforms
+WAVEFORM_ROWS = ('original', 'nrz_l', 'rz', 'manchester', 'ami')
+
+def encode_waveforms(data, samples_per_bit):
+    """Returns the upsampled data and all four encodings as one (5, len(data) * samples_per_bit) int8 array."""
+    waveforms = np.empty((len(WAVEFORM_ROWS), len(data) * samples_per_bit), dtype=np.int8)
+    waveforms[0].reshape(len(data), samples_per_bit)[:] = data[:, None]
+    encode_all_into(data, samples_per_bit, waveforms[1:])
+    return waveforms
+
+# Batches larger than this (5 * N * samples_per_bit bytes) are encoded per
+# request instead of cached, which bounds the cache at 64 MiB.
+MAX_CACHED_WAVEFORM_BYTES = 1 << 20
+
+@lru_cache(maxsize=64)
+def _cached_waveforms(bits_bytes, samples_per_bit):
+    """Encodes int8 bit bytes once per (bits, samples_per_bit) for both endpoints (read-only)."""
+    waveforms = encode_waveforms(np.frombuffer(bits_bytes, dtype=np.int8), samples_per_bit)
+    waveforms.setflags(write=False)
+    return waveforms
+
+def _waveforms_for(data, samples_per_bit):
+    """Returns the shared encode_waveforms buffer for data, reusing earlier requests."""
+    if len(WAVEFORM_ROWS) * len(data) * samples_per_bit > MAX_CACHED_WAVEFORM_BYTES:
+        return encode_waveforms(data.astype(np.int8), samples_per_bit)
+    return _cached_waveforms(data.astype(np.int8).tobytes(), samples_per_bit)
+
+# Bounded process pool for the spectral analysis: the four encodings of a
+# large request are analyzed in parallel, and the CPU-heavy FFT/Welch work of
+# all requests is capped at a few processes instead of piling onto threads.
+# Pool workers run scipy.fft single-threaded so they don't oversubscribe cores.
+# Each worker costs tens of MB, so the pool stays small on memory-limited hosts,
+# and it only starts spectral.py (NumPy and SciPy) rather than this Flask app.
+# Workers are spawned rather than forked: forking after Numba's parallel
+# kernels have started their thread pool can deadlock the child processes.
+# The pool is created on first use so gunicorn workers each get their own.
+POOL_WORKERS = min(4, os.cpu_count() or 1)
+
+# Below this many samples per signal, the pool's submission and pickling cost
+# more than the analysis itself, so the batch runs in the request thread (the
+# UI's sizes always do).
+MIN_POOL_SAMPLES = 1 << 16
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    """Returns the shared spectral-analysis process pool, creating it if needed."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+def _map_on_pool(fn, *iterables):
+    """
+    Maps fn over the spectral pool. A pool whose worker died is broken for
+    good, so it is discarded and the map retried once on a fresh pool.
+    """
+    global _executor
+    for attempt in range(2):
+        executor = _get_executor()
+        try:
+            return list(executor.map(fn, *iterables))
+        except BrokenProcessPool:
+            with _executor_lock:
+                if _executor is executor:
+                    _executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            if attempt:
+                raise
 
 @app.route('/')
 def index():
@@ -157,30 +249,27 @@ def encode():
         if not bits:
             return jsonify({'error': 'No bits provided'}), 400
         
+        if samples_per_bit < 1:
+            return jsonify({'error': 'samples_per_bit must be at least 1'}), 400
+        
         # Convert to numpy array
         data_array = np.array(bits)
         
-        # Generate time array
-        T = len(bits) / 1.0  # Assuming data_rate = 1
-        time_array = np.linspace(0, T, len(bits) * samples_per_bit, endpoint=False).tolist()
-        
-        # Create upsampled original data
-        data_upsampled = np.repeat(data_array, samples_per_bit).tolist()
-        
-        # Encode using all schemes
-        nrz_l = encode_nrz_l(data_array, samples_per_bit)
-        rz = encode_rz(data_array, samples_per_bit)
-        manchester = encode_manchester(data_array, samples_per_bit)
-        ami = encode_ami(data_array, samples_per_bit)
-        
-        return jsonify({
-            'time': time_array,
-            'original': data_upsampled,
-            'nrz_l': nrz_l,
-            'rz': rz,
-            'manchester': manchester,
-            'ami': ami
-        })
+        # Decimate for plotting without dropping any level transitions
+        stride = _plot_stride(len(bits) * samples_per_bit, samples_per_bit)
+        
+        # One contiguous buffer; the JSON provider serializes its rows directly
+        waveforms = np.ascontiguousarray(_waveforms_for(data_array, samples_per_bit)[:, ::stride])
+        response = dict(zip(WAVEFORM_ROWS, waveforms))
+        
+        # Time axis as t0 + i * dt for i < n (assuming data_rate = 1); the client expands it
+        response['time'] = {
+            't0': 0.0,
+            'dt': stride / samples_per_bit,
+            'n': waveforms.shape[1]
+        }
+        
+        return jsonify(response)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -190,8 +279,12 @@ def generate():
         data = request.json
         N = int(data.get('num_bits', 10))
         
-        # Generate random binary data
-        bits = np.random.randint(0, 2, N).tolist()
+        if N < 0:
+            return jsonify({'error': 'num_bits must be non-negative'}), 400
+        
+        # Generate random binary data: unpack N bits from (N + 7) // 8 random bytes
+        random_bytes = np.frombuffer(_rng.bytes((N + 7) // 8), dtype=np.uint8)
+        bits = np.unpackbits(random_bytes)[:N]
         
         return jsonify({'bits': bits})
     except Exception as e:
@@ -208,39 +301,32 @@ def spectral_analysis():
         if not bits:
             return jsonify({'error': 'No bits provided'}), 400
         
+        if samples_per_bit < 1:
+            return jsonify({'error': 'samples_per_bit must be at least 1'}), 400
+        
         # Convert to numpy array
         data_array = np.array(bits)
         
         # Calculate sampling rate
         sampling_rate = samples_per_bit * data_rate
         
-        # Encode using all schemes
-        nrz_l_signal = np.array(encode_nrz_l(data_array, samples_per_bit))
-        rz_signal = np.array(encode_rz(data_array, samples_per_bit))
-        manchester_signal = np.array(encode_manchester(data_array, samples_per_bit))
-        ami_signal = np.array(encode_ami(data_array, samples_per_bit))
-        
-        # Calculate PSD for each encoding
-        results = {}
-        
-        for name, signal in [('nrz_l', nrz_l_signal), ('rz', rz_signal), 
-                             ('manchester', manchester_signal), ('ami', ami_signal)]:
-            # Calculate frequency domain
-            freqs_fft, magnitude = calculate_fft(signal, sampling_rate)
-            freqs_psd, psd = calculate_psd(signal, sampling_rate)
-            
-            # Calculate metrics
-            metrics = calculate_spectral_efficiency_metrics(signal, data_rate, sampling_rate)
-            
-            results[name] = {
-                'frequencies_fft': freqs_fft[:len(freqs_fft)//2],  # Limit for performance
-                'magnitude': magnitude[:len(magnitude)//2],
-                'frequencies_psd': freqs_psd,
-                'psd': psd,
-                'metrics': metrics
-            }
+        # Encode all schemes into one batch (usually cached from /api/encode);
+        # rows 1-4 hold the encoded signals
+        names = WAVEFORM_ROWS[1:]
+        signals = _waveforms_for(data_array, samples_per_bit)[1:].astype(np.float32)
+        
+        # Analyze the four encodings as one batch, or in parallel on the
+        # worker pool when the signals are long enough to pay for it
+        if POOL_WORKERS > 1 and signals.shape[1] >= MIN_POOL_SAMPLES:
+            analyses = _map_on_pool(analyze_signal, signals,
+                                    [sampling_rate] * len(signals), [data_rate] * len(signals))
+        else:
+            analyses = analyze_signals(signals, sampling_rate, data_rate)
+        results = dict(zip(names, analyses))
         
         return jsonify(results)
+    except BrokenProcessPool:
+        return jsonify({'error': 'Spectral analysis workers crashed, please try again'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -49,20 +49,17 @@ def encode_rz(data, samples_per_bit):
     1 -> +V for half bit, 0 for half bit
     0 -> -V for half bit, 0 for half bit
     """
-    total_samples = len(data) * samples_per_bit
-    rz_signal = np.zeros(total_samples)
     half_bit_samples = samples_per_bit // 2
     
-    for i, bit in enumerate(data):
-        start_index = i * samples_per_bit
-        mid_index = start_index + half_bit_samples
-        
-        if bit == 1:
-            rz_signal[start_index:mid_index] = 1
-            # The rest of the bit period is already 0
-        else: # bit == 0
-            rz_signal[start_index:mid_index] = -1
-            # The rest of the bit period is already 0
+    # Polarity of each bit: 1 -> +1, 0 -> -1
+    polarity = np.where(data == 1, 1.0, -1.0)
+    
+    # Pulse shape for one bit period: +1 for the first half, 0 for the rest
+    mask = np.zeros(samples_per_bit)
+    mask[:half_bit_samples] = 1
+    
+    # Outer product gives one row per bit; flatten into a single signal
+    rz_signal = (polarity[:, None] * mask[None, :]).ravel()
             
     return rz_signal
 
@@ -73,23 +70,17 @@ def encode_manchester(data, samples_per_bit):
     1 -> Low-to-High transition at mid-bit
     0 -> High-to-Low transition at mid-bit
     """
-    total_samples = len(data) * samples_per_bit
-    manchester_signal = np.zeros(total_samples)
     half_bit_samples = samples_per_bit // 2
     
-    for i, bit in enumerate(data):
-        start_index = i * samples_per_bit
-        mid_index = start_index + half_bit_samples
-        end_index = start_index + samples_per_bit
-        
-        if bit == 1:
-            # Low-to-High transition
-            manchester_signal[start_index:mid_index] = -1
-            manchester_signal[mid_index:end_index] = 1
-        else: # bit == 0
-            # High-to-Low transition
-            manchester_signal[start_index:mid_index] = 1
-            manchester_signal[mid_index:end_index] = -1
+    # Low-to-High template for one bit period: -1 for the first half, +1 after
+    template = np.concatenate([-np.ones(half_bit_samples),
+                               np.ones(samples_per_bit - half_bit_samples)])
+    
+    # A 1 keeps the template, a 0 flips it (High-to-Low)
+    sign = np.where(data == 1, 1.0, -1.0)
+    
+    # Outer product gives one row per bit; flatten into a single signal
+    manchester_signal = np.multiply.outer(sign, template).ravel()
             
     return manchester_signal
 
@@ -99,24 +90,16 @@ def encode_ami(data, samples_per_bit):
     0 -> 0V
     1 -> Alternates between +V and -V
     """
-    total_samples = len(data) * samples_per_bit
-    ami_signal = np.zeros(total_samples)
+    # Mark each '1' (Mark) in the data
+    ones = (data == 1).astype(np.int8)
     
-    # We need to track the polarity of the last '1' (Mark)
-    last_polarity = 1  # Start with +V
+    # The polarity of a Mark only depends on how many Marks came before it:
+    # the 1st, 3rd, 5th, ... Mark is +V and the 2nd, 4th, ... Mark is -V
+    mark_count = np.cumsum(ones)
+    polarity = np.where(ones == 1, 1 - 2 * ((mark_count - 1) & 1), 0).astype(np.float64)
     
-    for i, bit in enumerate(data):
-        if bit == 1:
-            # Set the pulse for the entire bit duration
-            start_index = i * samples_per_bit
-            end_index = start_index + samples_per_bit
-            
-            ami_signal[start_index:end_index] = last_polarity
-            
-            # Invert the polarity for the next '1'
-            last_polarity *= -1
-        
-        # If bit is 0, we do nothing (it stays 0)
+    # Hold each level for the entire bit duration (0s stay at 0V)
+    ami_signal = np.repeat(polarity, samples_per_bit)
             
     return ami_signal
 
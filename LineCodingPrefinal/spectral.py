@@ -0,0 +1,153 @@
+from functools import lru_cache
+import base64
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as scipy_fft
+from scipy import signal as scipy_signal
+
+# Spectral Analysis Functions
+# Kept free of Flask and Numba so the spectral process pool's workers only
+# import NumPy and SciPy. The functions accept a single signal or a 2D array
+# with one signal per row; batching the rows lets scipy.fft plan each
+# transform length once, and `workers` sets how many threads it may use.
+# Signals only take values in {-1, 0, +1}, so int8 waveforms are promoted to
+# single precision here, which halves the memory traffic of the FFT/Welch passes.
+def _positive_spectrum(signal, sampling_rate, workers=-1):
+    """Return positive frequencies (below Nyquist) and FFT magnitudes along the last axis."""
+    n = signal.shape[-1]
+
+    # Compute FFT (real input, so only the positive frequencies are computed)
+    fft_vals = scipy_fft.rfft(signal, axis=-1, workers=workers)
+    fft_magnitude = np.abs(fft_vals)
+
+    # Frequency axis (normalized by Nyquist frequency)
+    freqs = scipy_fft.rfftfreq(n, 1/sampling_rate)
+
+    # Keep the bins below Nyquist, matching the positive half of a full FFT
+    n_positive = (n + 1) // 2
+    return freqs[:n_positive], fft_magnitude[..., :n_positive]
+
+@lru_cache(maxsize=8)
+def _hann_window(nperseg):
+    """Returns the periodic Hann window used for Welch segments (read-only)."""
+    window = scipy_signal.get_window('hann', nperseg).astype(np.float32)
+    window.setflags(write=False)
+    return window
+
+def _welch(signal, sampling_rate, nperseg, workers=-1):
+    """
+    Welch PSD estimate along the last axis, equivalent to scipy.signal.welch
+    with its defaults (Hann window, 50% overlap, constant detrend, density
+    scaling). All segments of all rows go through a single rfft call.
+    """
+    step = nperseg - nperseg // 2
+    window = _hann_window(nperseg)
+
+    # Strided view of the overlapping segments: (..., n_segments, nperseg)
+    segments = sliding_window_view(signal, nperseg, axis=-1)[..., ::step, :]
+    segments = (segments - segments.mean(axis=-1, keepdims=True)) * window
+
+    power = np.abs(scipy_fft.rfft(segments, axis=-1, workers=workers)) ** 2
+    power *= 1.0 / (sampling_rate * np.sum(window ** 2))
+
+    # One-sided spectrum: double everything except DC (and Nyquist for even nperseg)
+    if nperseg % 2:
+        power[..., 1:] *= 2
+    else:
+        power[..., 1:-1] *= 2
+
+    return scipy_fft.rfftfreq(nperseg, 1/sampling_rate), power.mean(axis=-2)
+
+def calculate_fft(signal_array, sampling_rate, workers=-1):
+    """Calculate FFT and frequency spectrum of a signal, plus its peak magnitude."""
+    signal = np.asarray(signal_array, dtype=np.float32)
+
+    freqs_positive, magnitude_positive = _positive_spectrum(signal, sampling_rate, workers)
+
+    # Raw units; the peak lets the client normalize at render time
+    return freqs_positive, magnitude_positive, np.max(magnitude_positive, axis=-1)
+
+def calculate_psd(signal_array, sampling_rate, workers=-1):
+    """Calculate Power Spectral Density using Welch's method, plus its peak value."""
+    signal = np.asarray(signal_array, dtype=np.float32)
+
+    # Use Welch's method for better spectral estimation
+    freqs, psd = _welch(signal, sampling_rate, min(256, signal.shape[-1]//4), workers)
+
+    # Raw units; the peak lets the client normalize at render time
+    return freqs, psd, np.max(psd, axis=-1)
+
+def calculate_spectral_efficiency_metrics(signal_array, data_rate, sampling_rate, workers=-1):
+    """Calculate spectral efficiency metrics (one dict per row for 2D input)."""
+    signal = np.asarray(signal_array, dtype=np.float32)
+
+    # Calculate FFT
+    freqs_positive, magnitude_positive = _positive_spectrum(signal, sampling_rate, workers)
+    psd = magnitude_positive ** 2
+
+    if psd.ndim > 1:
+        return [_spectral_metrics(freqs_positive, psd_positive, data_rate) for psd_positive in psd]
+    return _spectral_metrics(freqs_positive, psd, data_rate)
+
+def _spectral_metrics(freqs_positive, psd_positive, data_rate):
+    """Compute the metrics dict from a one-sided power spectrum."""
+    # Calculate DC component (power at 0 Hz)
+    dc_power = psd_positive[0] if len(psd_positive) > 0 else 0
+    total_power = np.sum(psd_positive)
+    dc_percentage = (dc_power / total_power * 100) if total_power > 0 else 0
+
+    # Calculate bandwidth (frequency where 90% of power is contained)
+    cumulative_power = np.cumsum(psd_positive)
+    total_power_90 = total_power * 0.9
+    bandwidth_idx = np.searchsorted(cumulative_power, total_power_90)
+    bandwidth_90 = freqs_positive[min(bandwidth_idx, len(freqs_positive) - 1)]
+
+    # Spectral efficiency (bits per Hz)
+    spectral_efficiency = data_rate / bandwidth_90 if bandwidth_90 > 0 else 0
+
+    # Find peak frequency
+    peak_idx = np.argmax(psd_positive[1:]) + 1  # Skip DC component
+    peak_frequency = freqs_positive[peak_idx] if peak_idx < len(freqs_positive) else 0
+
+    # Bandwidth efficiency (normalized by data rate)
+    bandwidth_efficiency = bandwidth_90 / data_rate if data_rate > 0 else 0
+
+    return {
+        'dc_component': float(dc_percentage),
+        'bandwidth_90': float(bandwidth_90),
+        'spectral_efficiency': float(spectral_efficiency),
+        'peak_frequency': float(peak_frequency),
+        'bandwidth_efficiency': float(bandwidth_efficiency),
+        'total_power': float(total_power)
+    }
+
+def _encode_array(values):
+    """Pack a numeric array as base64 little-endian float32 for the client."""
+    values = np.ascontiguousarray(values, dtype='<f4')
+    return {
+        'dtype': 'float32',
+        'length': int(values.size),
+        'data': base64.b64encode(values.tobytes()).decode('ascii')
+    }
+
+def analyze_signals(signals, sampling_rate, data_rate, workers=-1):
+    """Computes the spectral-analysis results for each row of a 2D signal batch."""
+    freqs_fft, magnitudes, magnitude_maxes = calculate_fft(signals, sampling_rate, workers)
+    freqs_psd, psds, psd_maxes = calculate_psd(signals, sampling_rate, workers)
+    metrics = calculate_spectral_efficiency_metrics(signals, data_rate, sampling_rate, workers)
+
+    half = len(freqs_fft) // 2  # Limit for performance
+    return [{
+        'frequencies_fft': _encode_array(freqs_fft[:half]),
+        'magnitude': _encode_array(magnitude[:half]),
+        'magnitude_max': float(magnitude_max),
+        'frequencies_psd': _encode_array(freqs_psd),
+        'psd': _encode_array(psd),
+        'psd_max': float(psd_max),
+        'metrics': row_metrics
+    } for magnitude, magnitude_max, psd, psd_max, row_metrics
+      in zip(magnitudes, magnitude_maxes, psds, psd_maxes, metrics)]
+
+def analyze_signal(signal, sampling_rate, data_rate):
+    """Pool entry point: analyzes one signal single-threaded, as the pool supplies the parallelism."""
+    return analyze_signals(signal[np.newaxis], sampling_rate, data_rate, workers=1)[0]
@@ -2,6 +2,27 @@
 let currentData = null;
 let currentTime = null;
 
+// Decode a base64-encoded float32 array ({ dtype, length, data }) from the server
+function decodeFloat32Array(packed) {
+    const bytes = Uint8Array.from(atob(packed.data), c => c.charCodeAt(0));
+    return new Float32Array(bytes.buffer, 0, packed.length);
+}
+
+// Scale values in place by their peak (as sent by the server), leaving all-zero data unchanged
+function normalizeByPeak(values, peak) {
+    if (peak > 0) {
+        for (let i = 0; i < values.length; i++) {
+            values[i] /= peak;
+        }
+    }
+    return values;
+}
+
+// Expand the server's time axis description ({ t0, dt, n }) into sample times
+function buildTimeAxis(time) {
+    return Float64Array.from({ length: time.n }, (_, i) => time.t0 + i * time.dt);
+}
+
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
     initializeSliders();
@@ -142,6 +163,8 @@ async function encodeData(bits) {
 
 // Create Plotly visualization
 function createVisualization(data) {
+    const time = buildTimeAxis(data.time);
+    
     // Color scheme for each encoding
     const colors = {
         original: '#4A90E2',
@@ -227,7 +250,7 @@ function createVisualization(data) {
 
     // Original data (row 1)
     fig.data.push({
-        x: data.time,
+        x: time,
         y: data.original,
         type: 'scatter',
         mode: 'lines',
@@ -248,7 +271,7 @@ function createVisualization(data) {
 
     // NRZ-L (row 2)
     fig.data.push({
-        x: data.time,
+        x: time,
         y: data.nrz_l,
         type: 'scatter',
         mode: 'lines',
@@ -269,7 +292,7 @@ function createVisualization(data) {
 
     // RZ (row 3)
     fig.data.push({
-        x: data.time,
+        x: time,
         y: data.rz,
         type: 'scatter',
         mode: 'lines',
@@ -290,7 +313,7 @@ function createVisualization(data) {
 
     // Manchester (row 4)
     fig.data.push({
-        x: data.time,
+        x: time,
         y: data.manchester,
         type: 'scatter',
         mode: 'lines',
@@ -311,7 +334,7 @@ function createVisualization(data) {
 
     // AMI (row 5)
     fig.data.push({
-        x: data.time,
+        x: time,
         y: data.ami,
         type: 'scatter',
         mode: 'lines',
@@ -440,8 +463,8 @@ function createPSDVisualization(spectralData) {
         if (spectralData[key]) {
             const schemeData = spectralData[key];
             traces.push({
-                x: schemeData.frequencies_psd,
-                y: schemeData.psd,
+                x: decodeFloat32Array(schemeData.frequencies_psd),
+                y: normalizeByPeak(decodeFloat32Array(schemeData.psd), schemeData.psd_max),
                 type: 'scatter',
                 mode: 'lines',
                 name: name,